@@ -1,10 +1,18 @@
 import argparse
+import atexit
+import csv
 import os
+import queue
+import re
 import sys
+import threading
 import rtmidi
 import vlc
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache, partial
+from typing import NamedTuple
 
 # =============================================================================
 # Configuration
@@ -30,6 +38,54 @@ SETLIST_PLAYSPEED = 2
 SETLIST_STARTTIME = 3
 SETLIST_ENDTIME=4
 
+class SetlistEntry(NamedTuple):
+    """One line of the setlist, as loaded by read_setlist."""
+    index: int      # 0-based index, selected by MIDI Program Change
+    name: str       # media filename (resolved later with the default path and extension)
+    rate: int       # play rate in %
+    start: str      # start time, HH:MM:SS
+    end: str        # end time, HH:MM:SS
+
+class MediaDesc(NamedTuple):
+    """A setlist entry ready to be played: resolved path and playback parameters precomputed."""
+    index: int      # 0-based index, selected by MIDI Program Change
+    path: str       # media filename with path and extension
+    rate: float     # play rate (1.0 = normal speed)
+    start_ms: int   # start time, in milliseconds
+    end_ms: int     # end time, in milliseconds
+
+# end time used when the setlist gives none: the media is played until its end
+SETLIST_DEFAULT_END = "99:59:59"
+
+# read buffer used for setlist files (1 MiB, instead of the 8 KiB default)
+SETLIST_READ_BUFFER = 1 << 20
+
+# os.path helpers used per setlist entry, bound once to skip the attribute lookups
+_isabs = os.path.isabs
+_splitext = os.path.splitext
+_PATH_SEPARATORS = os.sep + (os.altsep or '')
+
+# HH:MM:SS matcher, compiled once and shared by all setlist lines (ASCII digits only)
+_TIME_RE = re.compile(r'\A\d{1,2}:[0-5]\d:[0-5]\d\Z', re.ASCII).match
+
+def validate_time_format(time_str):
+    """
+    Checks that a time string is in HH:MM:SS format (hours up to 99).
+    Spaces around the time are accepted, as int() does for each part.
+    
+    Args:
+    - time_str (str): The time string to check.
+    
+    Returns:
+    - bool: True if the format is valid, otherwise False.
+    """
+    return _TIME_RE(time_str.strip()) is not None
+
+def time_to_ms(time_str):
+    """Convert a valid HH:MM:SS time string to milliseconds."""
+    hours, minutes, seconds = map(int, time_str.split(':'))
+    return ((hours * 60 + minutes) * 60 + seconds) * 1000
+
 def read_setlist(file_name):
     """
     Function to read a file and load its content into a table. This function works with LivePrompter setlist, or more complete setlists
@@ -38,73 +94,73 @@ def read_setlist(file_name):
     - file_name (str): Path to the file to read.
     
     Returns:
-    - data_table (list): A list containing the data read, with each line being
-      a sublist containing the index, string, integer, start time, and end time.
+    - data_table (list): A list of SetlistEntry (index, media name, play rate,
+      start time and end time), one per valid line.
       
     Format of Input File
     - TODO : for video support, add arguments for zoom and other as needed
     """
     setlist_table = []
+    append_entry = setlist_table.append  # bound once, called per valid line
+    errors = []     # reported all at once, after the file is parsed
     try:
-        with open(file_name, 'r') as file:
-            for index, line in enumerate(file):
-                line = line.strip()
-                if not line:
-                    continue  # Skip empty lines
-                #if ',' in line:
-                elements = line.split(',')
-                #else:
-                #    elements = line.split()
-
-                if len(elements) < 2:
-                    print(f"Error at line {index + 1}: Missing mandatory elements Index and Media filename ({line})")
-                    continue
-
-                # Extract the mandatory string
-                media_index = int(elements[SETLIST_INDEX])-1
-                media_name = elements[SETLIST_MEDIANAME]
-
-                # Default values for the other fields
-                play_speed = 100
-                start_time = "00:00:00"
-                end_time = "99:59:59"
-
-                # Set optional values if they exist in the line
-                if len(elements) > SETLIST_PLAYSPEED:
-                    try:
-                        play_speed = int(elements[SETLIST_PLAYSPEED])
-                    except ValueError:
-                        print(f"Error at line {index + 1}: '{elements[SETLIST_PLAYSPEED]}' is not an integer.")
+        # setlists are small: read the whole file at once, then parse from memory
+        with open(file_name, 'r', buffering=SETLIST_READ_BUFFER, newline='') as file:
+            lines = file.read().splitlines()
+
+        # QUOTE_NONE: quotes are part of the names, and each line is exactly one row (as with split(','))
+        for index, elements in enumerate(csv.reader(lines, quoting=csv.QUOTE_NONE)):
+            if not any(field.strip() for field in elements):
+                continue  # Skip empty lines (and lines made of spaces only)
+
+            if len(elements) < 2:
+                errors.append(f"Error at line {index + 1}: Missing mandatory elements Index and Media filename ({','.join(elements)})")
+                continue
+
+            # Extract the mandatory index and string
+            index_field = elements[SETLIST_INDEX].strip()
+            if not index_field.isdecimal():
+                errors.append(f"Error at line {index + 1}: '{elements[SETLIST_INDEX]}' is not an integer.")
+                continue
+            media_index = int(index_field)-1
+            media_name = elements[SETLIST_MEDIANAME]
+            if len(elements) == SETLIST_MEDIANAME + 1:
+                media_name = media_name.rstrip()    # spaces at the end of the line are not part of the name
+
+            # Default values for the other fields
+            play_speed = 100
+            start_time = "00:00:00"
+            end_time = SETLIST_DEFAULT_END
+
+            # Set optional values if they exist in the line
+            if len(elements) > SETLIST_PLAYSPEED:
+                speed_field = elements[SETLIST_PLAYSPEED].strip()
+                if speed_field:     # empty field: keep the default play rate
+                    if not speed_field.isdecimal():
+                        errors.append(f"Error at line {index + 1}: '{elements[SETLIST_PLAYSPEED]}' is not an integer.")
                         continue
+                    play_speed = int(speed_field)
 
-                if len(elements) > SETLIST_STARTTIME:
-                    start_time = elements[SETLIST_STARTTIME]
+            if len(elements) > SETLIST_STARTTIME:
+                start_time = elements[SETLIST_STARTTIME].strip()
 
-                if len(elements) > SETLIST_ENDTIME:
-                    end_time = elements[SETLIST_ENDTIME]
+            if len(elements) > SETLIST_ENDTIME:
+                end_time = elements[SETLIST_ENDTIME].strip()
 
-                # Validate times (start and end) to be in HH:MM:SS format
-                def validate_time_format(time_str):
-                    try:
-                        parts = time_str.split(':')
-                        if len(parts) != 3:
-                            return False
-                        hours, minutes, seconds = map(int, parts)
-                        return 0 <= hours <= 99 and 0 <= minutes < 60 and 0 <= seconds < 60
-                    except ValueError:
-                        return False
+            # Validate times (start and end) to be in HH:MM:SS format
+            if not validate_time_format(start_time):
+                errors.append(f"Error at line {index + 1}: Invalid start time format '{start_time}'")
+                continue
 
-                if not validate_time_format(start_time):
-                    print(f"Error at line {index + 1}: Invalid start time format '{start_time}'")
-                    continue
+            if not validate_time_format(end_time):
+                errors.append(f"Error at line {index + 1}: Invalid end time format '{end_time}'")
+                continue
 
-                if not validate_time_format(end_time):
-                    print(f"Error at line {index + 1}: Invalid end time format '{end_time}'")
-                    continue
-
-                # Append the data (media_index, string, integer, start time, end time)
-                setlist_table.append([media_index, media_name, play_speed, start_time, end_time])
+            # Append the data (media_index, string, integer, start time, end time)
+            append_entry(SetlistEntry(media_index, media_name, play_speed, start_time, end_time))
 
+        if errors:
+            print("\n".join(errors))
         return setlist_table
 
     except FileNotFoundError:
@@ -114,48 +170,53 @@ def read_setlist(file_name):
         print(f"Error reading the Setlist file: {e}")
         return []
 
+@lru_cache(maxsize=16)
+def _path_prefix(default_path):
+    # default path with exactly one trailing separator, ready to be concatenated with a filename
+    return default_path.rstrip(_PATH_SEPARATORS) + os.sep
+
+@lru_cache(maxsize=4096)
 def resolve_file_path(filename, default_path, default_ext): 
-    resolved_setlist = []
-
-    # check if the media filename has an extension. If not, add the defautl extension if defined, otherwise, do nothing
-    if not test_filename_has_extension(filename):
-        if default_ext:
-            if not default_ext.startswith('.'):
-                filename = filename + '.'
-            filename = filename + default_ext
-
-    # check if the media filename is absolute (has a full path)
-    if not test_filename_has_fullpath(filename):
-        if default_path:
-            filename = os.path.join(default_path, filename)
-                
+    # add the default extension if the media filename has none (and a default is defined),
+    # then the default path if the filename is not absolute
+    if default_ext and not _splitext(filename)[1]:
+        filename = f"{filename}.{default_ext.lstrip('.')}"
+
+    if default_path and not _isabs(filename):
+        filename = _path_prefix(default_path) + filename
+
     return filename
 
 def resolve_setlist_files_path(setlist_table, default_path, default_ext): 
-    resolved_setlist = []
-    for media in setlist_table:
-        media_index = media[0]
-        media_name = media[1]
-        media_playrate = media[2]
-        media_start = media[3]
-        media_end = media[4]
-                
-        # print(f"index = {media_index} - name = {media_name} - rate = {media_playrate} - start at {media_start} - end at {media_end}")
-        resolved_setlist.append([media_index, resolve_file_path(media_name, default_path, default_ext), media_playrate, media_start, media_end])
-    
-    return resolved_setlist
-
-
-def get_mediadesc_by_index(setlist_table, media_index):
-    for media_desc in setlist_table:
-        if media_desc[SETLIST_INDEX] == media_index:
-            return media_desc
-            
-    return None
-    
+    # Converts the SetlistEntry rows to MediaDesc: path resolved, rate and times converted once for all
+    # The result is an immutable tuple: it is shared, read-only, by the MIDI handlers
+    resolve = resolve_file_path  # local alias, avoids a global lookup per entry
+    return tuple(MediaDesc(media.index, resolve(media.name, default_path, default_ext),
+                           media.rate / 100.0, time_to_ms(media.start), time_to_ms(media.end))
+                 for media in setlist_table)
+
+
 # =============================================================================
 # Misc functions to check if folders and files exist
 # =============================================================================
+# stat() results are cached for a few seconds: the same paths are checked
+# several times during startup, and media files may still be moved later on
+STAT_CACHE_TTL = 5
+
+@lru_cache(maxsize=1024)
+def _cached_isdir(path, ttl_slot):
+    return os.path.isdir(path)
+
+@lru_cache(maxsize=1024)
+def _cached_isfile(path, ttl_slot):
+    return os.path.isfile(path)
+
+def _isdir(path):
+    return _cached_isdir(path, int(time.monotonic() // STAT_CACHE_TTL))
+
+def _isfile(path):
+    return _cached_isfile(path, int(time.monotonic() // STAT_CACHE_TTL))
+
 def check_directory(path):
     """
     Checks if a directory exists.
@@ -166,40 +227,65 @@ def check_directory(path):
     Returns:
     - bool: True if the directory exists, otherwise False.
     """
-    return os.path.isdir(path)
+    return _isdir(path)
+
+@lru_cache(maxsize=64)
+def _path_has_ext(path, ext):
+    # Vérifie les fichiers dans le dossier (scandir gives the file type without an extra stat per entry)
+    with os.scandir(path) as entries:
+        return any(entry.is_file() and entry.name.lower().endswith(ext) for entry in entries)
 
 def check_ext_in_path(path, ext):
-    if not os.path.isdir(path):
+    # normalized once: lowercase, with the leading dot (so that 'mp3' does not match 'foomp3')
+    ext = ext.lower()
+    if not ext.startswith('.'):
+        ext = '.' + ext
+    try:
+        return _path_has_ext(path, ext)
+    except (FileNotFoundError, NotADirectoryError):
         print(f"Error: The directory '{path}' does not exist.")
         return False
 
-    # Vérifie les fichiers dans le dossier
-    found = any(
-        os.path.isfile(os.path.join(path, filename)) and filename.endswith(ext)
-        for filename in os.listdir(path)
-    )
-
-    if found:
-        return True
-    else:
-        return False
-
 def check_file_exists(fullpath):
-    if os.path.isfile(fullpath):
+    if _isfile(fullpath):
         return True
     else:
         return False
-    
-def check_file_in_path(path, filename):
-    fullpath = os.path.join(path, filename)
-    return check_file_exists(fullpath)
 
-def test_filename_has_fullpath(filename):
-    return os.path.isabs(filename)
+def _list_directory_files(directory):
+    # normalized names of the files of a directory (empty if the directory cannot be listed)
+    # only a fast path: a name missing here may still be found by a stat()
+    try:
+        with os.scandir(directory or os.curdir) as entries:
+            return {os.path.normcase(entry.name) for entry in entries if entry.is_file()}
+    except OSError:
+        return set()
+
+def find_missing_files(filenames):
+    """
+    Checks which files of a list do not exist. Each directory is read only once,
+    instead of one stat() per file. A name not found in the listing is checked with
+    a stat() before being reported missing: the listing cannot tell how the filesystem
+    compares names (case-insensitive on macOS, Unicode normalization) and is empty
+    for a directory that cannot be listed.
     
-def test_filename_has_extension(filename):
-    return bool(os.path.splitext(filename)[1])
+    Args:
+    - filenames (list): Paths of the files to check.
     
+    Returns:
+    - list: The filenames that could not be found, in the same order.
+    """
+    directory_files = {}
+    missing = []
+    for filename in filenames:
+        directory, name = os.path.split(filename)
+        files = directory_files.get(directory)
+        if files is None:
+            files = directory_files[directory] = _list_directory_files(directory)
+        if os.path.normcase(name) not in files and not _isfile(filename):
+            missing.append(filename)
+    return missing
+
 # =============================================================================
 # To have a clean output in case of invalid command line option. The online help is displayed with a message indicating which parameter is wrong
 # =============================================================================
@@ -212,11 +298,23 @@ class CustomArgumentParser(argparse.ArgumentParser):
 # =============================================================================
 # MIDI Interface utilities
 # =============================================================================
+# The list of ports is queried once per MidiIn object, then shared by all helpers:
+# a new MidiIn object (e.g. after a MIDI device is plugged) queries the MIDI subsystem again
+_cached_ports = (None, None)    # (MidiIn object, its list of ports)
+
+def get_midi_ports(midi_input_ports):
+    global _cached_ports
+    owner, ports = _cached_ports
+    if owner is not midi_input_ports:
+        ports = midi_input_ports.get_ports()
+        _cached_ports = (midi_input_ports, ports)
+    return ports
+
 def get_inputport_table(midi_input_ports, verbose):
-    
-    result = []
+    # Returns a dict {lowercase port name: port id of the first port with this name}
+    result = {}
         
-    ports = midi_input_ports.get_ports()
+    ports = get_midi_ports(midi_input_ports)
     if not ports:
         if verbose:
             print("No available MIDI ports")
@@ -225,10 +323,10 @@ def get_inputport_table(midi_input_ports, verbose):
             print("Available ports:")
 
         for port in ports:
-            port_desc = port.split()
-            port_id = int(port_desc[-1])
-            port_name = " ".join(port_desc[:-1])
-            result.append((port_name, port_id))
+            # port description is "<port name> <port id>"
+            port_name, _, port_id = port.rpartition(' ')
+            # identical interfaces differ only by their id: the first one is kept, as in a linear scan
+            result.setdefault(port_name.lower(), int(port_id))
             if verbose:
                 print(f"- {port_name}")
             
@@ -236,114 +334,30 @@ def get_inputport_table(midi_input_ports, verbose):
     
 def get_portid_by_name(port_name, ports_table, verbose=False):
     if port_name != "":
-        for port in ports_table:
-            if port_name.lower() in port[0].lower():
-                return port[1]
+        # exact name first, then any port whose name contains the requested one (case insensitive)
+        needle = port_name.lower()
+        port_id = ports_table.get(needle)
+        if port_id is not None:
+            return port_id
+        return next((port_id for name, port_id in ports_table.items() if needle in name), -1)
     return -1
     
-def list_midi_input_ports():
+def list_midi_input_ports(midi_input_ports):
     """
     Lists available MIDI input ports.
     """
-    ports = midi_input_ports.get_ports()
+    ports = get_midi_ports(midi_input_ports)
     if not ports:
         print("No available MIDI Input ports.")
     else:
         print("Available MIDI Input ports:")
         for port in ports:
             print(f"- {port}")
-        print("Use option --input <number> to specify the MIDI port to be used to receive commands (port 0 is sueed by default)")
-
-def check_midi_input_port(input_port, verbose):
-    """
-    Lists available MIDI input ports.
-    """
-    ports = midi_input_ports.get_ports()
-    if not ports:
-        print("No available MIDI Input ports.")
-        return False
-    elif input_port < 0 or input_port >= len(ports):
-        print("The specific MIDI port is not available. Please use the option --midiports to get the list of available ports.")
-        return False
-    else:
-        if verbose:
-            print(f"Using MIDI port: {ports[1]}")
-        return True
-
-# =============================================================================
-# MIDI Messages utilities
-# =============================================================================
-# Mapping of MIDI command status bytes (upper nibble)
-MIDI_COMMANDS = {
-    0x80: "Note Off",
-    0x90: "Note On",
-    0xA0: "Polyphonic Key Pressure",
-    0xB0: "Control Change",
-    0xC0: "Program Change",
-    0xD0: "Channel Pressure",
-    0xE0: "Pitch Bend",
-    0xF0: "System Message",
-}
-
-# Note names for converting MIDI note numbers to musical names
-NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-
-def note_number_to_name(note_number):
-    """Convert MIDI note number to note name (e.g. 60 -> C4)."""
-    name = NOTE_NAMES[note_number % 12]
-    octave = (note_number // 12) - 1
-    return f"{name}{octave}"
-
-def decode_midi_message(message):
-    """Decode a raw MIDI message into human-readable format with parameters."""
-    status = message[0]
-    command = status & 0xF0
-    channel = (status & 0x0F) + 1  # MIDI channels are 1-based
-
-    command_name = MIDI_COMMANDS.get(command, f"Unknown (0x{command:X})")
-    output = f"{command_name} | Channel {channel} | "
-
-    if command in [0x80, 0x90]:  # Note Off / Note On
-        note = message[1]
-        velocity = message[2]
-        note_name = note_number_to_name(note)
-        output += f"Note: {note_name} ({note}) | Velocity: {velocity}"
-
-    elif command == 0xA0:  # Polyphonic Key Pressure
-        note = message[1]
-        pressure = message[2]
-        note_name = note_number_to_name(note)
-        output += f"Note: {note_name} ({note}) | Pressure: {pressure}"
-
-    elif command == 0xB0:  # Control Change
-        controller = message[1]
-        value = message[2]
-        output += f"Controller: {controller} | Value: {value}"
-
-    elif command == 0xC0:  # Program Change
-        program = message[1]
-        output += f"Program: {program}"
-
-    elif command == 0xD0:  # Channel Pressure
-        pressure = message[1]
-        output += f"Pressure: {pressure}"
-
-    elif command == 0xE0:  # Pitch Bend
-        lsb = message[1]
-        msb = message[2]
-        value = (msb << 7) | lsb
-        output += f"Pitch Bend: {value - 8192} (raw: {value})"
-
-    elif command == 0xF0:  # System Messages
-        output += f"Data: {message[1:]}"
-
-    else:
-        output += f"Raw data: {message[1:]}"
-
-    return output
+        print("Use option --midi-input <name> to specify the MIDI port to be used to receive commands")
 
 # =============================================================================
 # Interface with VLC
+# vlc_get_instance
 # vlc_create_instance
 # vlc_kill_all_instances
 # vlc_load_media_in_instance
@@ -351,15 +365,45 @@ def decode_midi_message(message):
 # vlc_pause_instance
 # vlc_stop_instance
 # =============================================================================
+# maximum time given to libvlc to parse each media of the setlist at startup (ms)
+MEDIA_PARSE_TIMEOUT = 5000
+
+# duration of the default media, played when the requested media is missing (seconds)
+DEFAULT_MEDIA_PLAY_TIME = 5
+
+# end time (ms) of a media played until its end (no stop-time option)
+_END_OF_MEDIA_MS = time_to_ms(SETLIST_DEFAULT_END)
+
+# libvlc instance shared by all the players: loading the plugins is done only once
+_vlc_instance = None
+
+# media players created by vlc_create_instance, the player index is the position in the list
 vlc_players = []
 
+# media kept loaded for the whole run (e.g. the setlist media pool), released with the players
+vlc_medias = []
+
+def _vlc_player(player_index):
+    # the player with this index, or None if the index is not valid
+    if 0 <= player_index < len(vlc_players):
+        return vlc_players[player_index]
+    return None
+
+def vlc_get_instance(verbose = False):
+    global _vlc_instance
+    if _vlc_instance is None:
+        options = ['--no-video-title-show']
+        if not verbose:
+            options.append('--quiet')
+        _vlc_instance = vlc.Instance(*options)
+    return _vlc_instance
+
 def vlc_create_instance(verbose = False):
     try:
-        vlc_instance = vlc.Instance()
-        mediaplayer = vlc_instance.MediaPlayer()
-        time.sleep(0.5)
-    
-        vlc_players.append([mediaplayer, player])
+        vlc_instance = vlc_get_instance(verbose)
+        player = vlc_instance.media_player_new()
+
+        vlc_players.append(player)
         return len(vlc_players)-1
         
     except Exception as e:
@@ -368,11 +412,23 @@ def vlc_create_instance(verbose = False):
         return -1
 
 def vlc_kill_all_instances(verbose = False):
+    # Stops and releases all the players, then the media kept loaded, then the shared libvlc instance
+    global _vlc_instance
     try:
-        n = 0
-        for vlc_instance in vlc_players:
-            print(f"Killing instance {n+1}")
-            n += 1
+        for n, player in enumerate(vlc_players):
+            if verbose:
+                print(f"Killing instance {n+1}")
+            player.stop()
+            player.release()
+        vlc_players.clear()
+
+        for media in vlc_medias:
+            media.release()
+        vlc_medias.clear()
+
+        if _vlc_instance is not None:
+            _vlc_instance.release()
+            _vlc_instance = None
 
         return True
         
@@ -381,95 +437,93 @@ def vlc_kill_all_instances(verbose = False):
             print(f"vlc_kill_all_instances: {e}")
         return False
 
+def vlc_media_options(media_desc):
+    # libvlc media options applying the start, end and play rate of a MediaDesc
+    # (set once when the media is created: nothing is left to do when it is played)
+    options = []
+    if media_desc.start_ms > 0:
+        options.append(f"start-time={media_desc.start_ms / 1000}")
+    if media_desc.end_ms < _END_OF_MEDIA_MS:
+        options.append(f"stop-time={media_desc.end_ms / 1000}")
+    if media_desc.rate != 1.0:
+        options.append(f"rate={media_desc.rate}")
+    return options
+
 def vlc_load_media_in_instance(player_index, media_desc, verbose = False):
     # The instance index is the value returned by vlc_create_instance
-    # The media_desc is the structure made of [index, media file name, play rate, start, end]
-    if player_index >= 0 and media:
-        instance = vlc_players[player_index]
-        mediaplayer = instance[0]
-        player = instance[1]
-
-        try:
-            media = mediaplayer.media_new(media_desc[1])
-            player.set_media(media)
-            return True
-        except Exception as e:
-            if verbose:
-                print(f"vlc_load_media_in_instance: {e}")
-            return False
-    else:
+    # The media_desc is a MediaDesc (index, media path, play rate, start and end in ms)
+    player = _vlc_player(player_index)
+    if player is None or not media_desc:
         return False
 
-def vlc_play_instance(player_index, verbose = False):
-    if player_index >= 0:
-        instance = vlc_players[player_index]
-        mediaplayer = instance[0]
-        player = instance[1]
-
-        try:
-            player.play()
-            return True
-        except Exception as e:
-            if verbose:
-                print(f"vlc_play_instance: {e}")
-            return False
-    else:
-        return False
-            
-def vlc_pause_instance(player_index, verbose = False):
-    if player_index >= 0:
-        instance = vlc_players[player_index]
-        mediaplayer = instance[0]
-        player = instance[1]
-
-        try:
-            player.pause()
-            return True
-        except Exception as e:
-            if verbose:
-                print(f"vlc_pause_instance: {e}")
-            return False
-    else:
+    try:
+        media = vlc_get_instance().media_new(media_desc.path, *vlc_media_options(media_desc))
+        player.set_media(media)
+        media.release()     # the player holds its own reference
+        return True
+    except Exception as e:
+        if verbose:
+            print(f"vlc_load_media_in_instance: {e}")
         return False
 
-def vlc_stop_instance(player_index, verbose = False):
-    if player_index >= 0:
-        instance = vlc_players[player_index]
-        mediaplayer = instance[0]
-        player = instance[1]
+def _vlc_player_call(operation, player_index, verbose = False):
+    # Calls the method 'operation' ('play', 'pause', 'stop') of the player with this index
+    player = _vlc_player(player_index)
+    if player is None:
+        return False
 
-        try:
-            player.stop()
-            return True
-        except Exception as e:
-            if verbose:
-                print(f"vlc_stop_instance: {e}")
-            return False
-    else:
+    try:
+        getattr(player, operation)()
+        return True
+    except Exception as e:
+        if verbose:
+            print(f"vlc_{operation}_instance: {e}")
         return False
-        
+
+vlc_play_instance = partial(_vlc_player_call, 'play')
+vlc_pause_instance = partial(_vlc_player_call, 'pause')
+vlc_stop_instance = partial(_vlc_player_call, 'stop')
         
     
 # =============================================================================
-# Interface with LivePrompter
+# Real-time scheduling
 # =============================================================================
-def handle_live_prompter(liveprompter_path, setlist_name):
+# SCHED_FIFO priority of the thread dispatching the MIDI commands (1 to 99: kept low, the audio stays above)
+REALTIME_PRIORITY = 10
+
+def set_realtime_priority(verbose = False):
     """
-    Handles the live prompt scenario where a specific setlist is required.
+    Switches the calling thread to the SCHED_FIFO real-time scheduling policy, so that the MIDI
+    commands are not delayed by the other processes. Every thread started later by this thread
+    inherits it: a thread that may start libvlc threads (decoders could then run above the MIDI
+    input) must go back to the normal priority with set_normal_priority.
+    The CPU affinity is not changed: the libvlc threads would inherit it too, and lose the other cores.
     
     Args:
-    - liveprompter_path (str): The path to the liveprompter directory.
-    - setlist_name (str): The name of the setlist file to look for.
+    - verbose (bool): Enable verbose output.
     
     Returns:
-    - bool: True if the setlist file exists, otherwise False.
+    - bool: True if the real-time priority is set, otherwise False.
     """
-    setlist_path = os.path.join(liveprompter_path, 'Setlists', setlist_name)
-    if not os.path.isfile(setlist_path):
-        print(f"Error: The setlist file '{setlist_name}' does not exist in './Setlists'.")
-        return False
-    print(f"Using setlist: {setlist_name}")
-    return True
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(REALTIME_PRIORITY))
+        if verbose:
+            print(f"Real-time priority set (SCHED_FIFO, priority {REALTIME_PRIORITY})")
+        return True
+    except AttributeError:
+        print(f"WARNING - Real-time priority is not supported on this system. Ignored.")
+    except PermissionError:
+        print(f"WARNING - Not allowed to set a real-time priority (needs CAP_SYS_NICE or an rtprio limit). Ignored.")
+    except OSError as e:
+        print(f"WARNING - Unable to set a real-time priority: {e}. Ignored.")
+    return False
+
+def set_normal_priority():
+    # Puts the calling thread back to the normal scheduling policy (SCHED_OTHER)
+    try:
+        os.sched_setscheduler(0, os.SCHED_OTHER, os.sched_param(0))
+    except (AttributeError, OSError):
+        pass
 
 
 # =============================================================================
@@ -490,13 +544,17 @@ def main():
     parser.add_argument('-ml', '--midiports', action='store_true', help="List available MIDI ports")
     
     # Option to specify MIDI input port number
-    parser.add_argument('-mi', '--midi-input', help="MIDI input port name to use for receiving commands")
+    parser.add_argument('-mi', '--midi-input', default="", help="MIDI input port name to use for receiving commands")
     
-    # Option to specify MIDI input port number
-    parser.add_argument('-mc', '--midi-channel', help="MIDI channel on which the commands are received")
+    # Option to specify the MIDI channel (checked by argparse: an invalid channel stops the program at startup)
+    parser.add_argument('-mc', '--midi-channel', type=int, choices=range(1, 17), default=1, metavar="{1..16}",
+                        help="MIDI channel on which the commands are received (default: 1)")
     
+    # --setlist and --liveprompter are mutually exclusive: invalid combinations are rejected by argparse
+    setlist_group = parser.add_mutually_exclusive_group()
+
     # Option to specify the set file
-    parser.add_argument('-s', '--setlist', required=False, help="Name of the file containing the Set List. The file should have the following structure:\n"
+    setlist_group.add_argument('-s', '--setlist', help="Name of the file containing the Set List. The file should have the following structure:\n"
                                                            "1. Filename of the media to play\n"
                                                            "2. (optional) Play Rate in %% (default is 100).\n"
                                                            "3. (optional) Start time in HH:MM:SS format (default is '00:00:00').\n"
@@ -504,7 +562,7 @@ def main():
                                                            "Example: 'Alice,23,12:30:00,13:00:00' or 'Bob,42,14:00:00' or 'Charlie,,15:00:00,99:59:59'")
     
     # Option for live prompter mode
-    parser.add_argument('-lp', '--liveprompter', required=False, help="Path to the liveprompter directory")
+    setlist_group.add_argument('-lp', '--liveprompter', help="Path to the liveprompter directory")
     
     # Option to check a directory
     parser.add_argument('-p', '--path', help="Default path of media files to play (if not specified in the playlist)")
@@ -518,6 +576,9 @@ def main():
     # Option to specify the default media file if a media file could not be found 
     parser.add_argument('-dm', '--default-missing-media', help="Filename of the media file played if a media file is missing.")
 
+    # Option to run the MIDI dispatch with a real-time scheduling priority (Linux only)
+    parser.add_argument('-rt', '--realtime', action='store_true', help="Dispatch the MIDI commands with a real-time priority (Linux only, needs CAP_SYS_NICE or an rtprio limit)")
+
     # Option for verbose output
     parser.add_argument('-v', '--verbose', action='store_true', help="Enable verbose output")
     
@@ -576,16 +637,11 @@ def main():
     # =============================================================================
     # List MIDI ports if the option is specified
     # Option treated first, to exist the program after displaying the list of available ports
+    # The MIDI subsystem is only opened here, or later just before opening the input port
     # =============================================================================
-    midi_input_ports = rtmidi.MidiIn()
-    inputports_table = get_inputport_table(midi_input_ports, verbose) # used later to open the port
-    
     if args.midiports:
-        if inputports_table:
-            print(inputports_table)
-        else:
-            print("No MIDI Input Ports found.")
-        #list_midi_input_ports()
+        # display the port names as reported by the MIDI subsystem (the table keys are lowercase)
+        list_midi_input_ports(rtmidi.MidiIn())
         exit(0)
 
     # =============================================================================
@@ -624,23 +680,13 @@ def main():
     # Handle Live Prompter Mode
     # =============================================================================
     if args.liveprompter:
-        # Ensure the option --liveprompter is mutually exclusive with --setlist
-        if args.setlist:
-            print("Error: '--liveprompter' and '--setlist' are mutually exclusive.")
-            exit(1)
-        
         # Verify the existence of the liveprompter directory
         if not check_directory(args.liveprompter):
+            print(f"Error: LivePrompter directory {args.liveprompter} could not be found. Program stopped.")
             exit(1)
-
-        # Ensure that the --setlist option is provided when --liveprompter is used
-        if not args.setlist:
-            print("Error: '--setlist' is required when using '--liveprompter'.")
-            exit(1)
-
-        # Check if the specified setlist file exists in the './Setlists' directory
-        if not handle_live_prompter(args.liveprompter, args.setlist):
-            exit(1)
+        # TODO : read the setlist from the LivePrompter 'Setlists' folder
+        print(f"Error: Reading the setlist from LivePrompter is not supported yet, use --setlist. Program stopped.")
+        exit(2)
 
     # =============================================================================
     # Build the playlist, based on the set list provided by option --setlist
@@ -668,21 +714,24 @@ def main():
         print(f"Error: Empty setlist. Program stopped.")
         exit(2)
         
-    # check if all media file exist
-    disperror = False
-    if not unsafeIgnoreMissingMedia:
-        for media in resolved_setlist:
-            filename = media[1]
-            fileok = check_file_exists(filename)
-            if not fileok:
-                disperror = True
-            if disperror:
-                print(f"Error: Media {filename} not found.")
-        if disperror:
-            print(f"Error: At least 1 media file could not be found. Program stopped.")
-            print(f"Check the setlist and path specified in the configuration file.")
-            exit(2)
+    # check if all media file exist (one directory read per folder, rather than one stat() per media)
+    media_filenames = [media.path for media in resolved_setlist]
+    missing_media = find_missing_files(media_filenames)
+
+    # media found at startup: the MIDI handlers test this set instead of the file system
+    valid_media_paths = set(media_filenames).difference(missing_media)
+    default_media_ok = bool(defaultMediaFile) and check_file_exists(defaultMediaFile)
+
+    if missing_media and not unsafeIgnoreMissingMedia:
+        for filename in missing_media:
+            print(f"Error: Media {filename} not found.")
+        print(f"Error: At least 1 media file could not be found. Program stopped.")
+        print(f"Check the setlist and path specified in the configuration file.")
+        exit(2)
         
+    # setlist index (as sent by Program Change) -> media description
+    setlist_by_index = {media.index: media for media in resolved_setlist}
+
     # Display the results in verbose mode if enabled
     if verbose:
         print("Displaying setlist content in verbose mode:")
@@ -699,26 +748,13 @@ def main():
     # vlc_pause_instance
     # vlc_stop_instance
     # =============================================================================
-    # creating a vlc instance
-    #vlc_player_main = vlc_create_instance(verbose)
-    #if vlc_player_main < 0:
-    #    print(f"Error: Unable to launch the main VLC instance. Program Stopped.")
-    #    exit(2)
-        
     # launch the second VLC instance for the click
 
     # =============================================================================
     # Handle MIDI Input Port
     # =============================================================================
-    midi_input_portname = ""  # TODO : get_from_configfile
-    if args.midi_input:
-        midi_input_portname = args.midi_input  # Store the MIDI input port number if provided
-
-    if args.midi_channel:
-        midi_channel = int(args.midi_channel)
-    else:
-        print(f"WARNING - Defaulting to use the MIDI channel 0")
-        midi_channel = 0
+    midi_input_portname = args.midi_input  # TODO : get_from_configfile
+    midi_channel = args.midi_channel
 
     # END OF INIT - REAL-TIME PART
     
@@ -726,12 +762,39 @@ def main():
     # =============================================================================
     # Open VLC instances
     # =============================================================================
-    vlc_instance_main = vlc.Instance()
+    main_player_index = vlc_create_instance(verbose)
+    if main_player_index < 0:
+        print(f"Error: Unable to launch the main VLC instance. Program Stopped.")
+        exit(2)
+    # players and libvlc resources are released when the program ends, whatever the reason
+    atexit.register(vlc_kill_all_instances)
+
+    vlc_instance_main = vlc_get_instance(verbose)
+    player_main = vlc_players[main_player_index]
     vlc_player_click = None
     vlc_player_video = None
-    
-    time.sleep(0.5)
-    player_main = vlc_instance_main.media_player_new()
+
+    # Create the media of the whole setlist once: a Program Change then only swaps the media of the player
+    # Start, end and play rate are set as media options here, so nothing is computed when a song is played
+    # A file used several times with the same parameters (e.g. a song played again as encore) gets a single media
+    # (created in setlist order, so that the first songs are also the first ones parsed below)
+    playable_media = [media for media in resolved_setlist if media.path in valid_media_paths]
+    default_desc = MediaDesc(-1, defaultMediaFile, 1.0, 0, _END_OF_MEDIA_MS) if default_media_ok else None
+    media_pool = {}
+    for media in playable_media + ([default_desc] if default_desc else []):
+        playback = media[1:]    # path, rate, start and end: everything but the index
+        if playback not in media_pool:
+            media_pool[playback] = vlc_instance_main.media_new(media.path, *vlc_media_options(media))
+
+    vlc_medias.extend(media_pool.values())     # released by vlc_kill_all_instances
+
+    media_cache = {media.index: media_pool[media[1:]] for media in playable_media}
+    default_media = media_pool[default_desc[1:]] if default_desc else None
+
+    # Parse the media (headers, duration) while the MIDI port is being opened: parse_with_options()
+    # only queues the request, libvlc parses in its own threads (local files only, no network lookup)
+    for media in media_pool.values():
+        media.parse_with_options(vlc.MediaParseFlag.local, MEDIA_PARSE_TIMEOUT)
 
 
 
@@ -742,6 +805,8 @@ def main():
     # =============================================================================
     # Open the MIDI Input Port
     # =============================================================================
+    midi_input_ports = rtmidi.MidiIn()
+    inputports_table = get_inputport_table(midi_input_ports, verbose)
     portid = get_portid_by_name(midi_input_portname, inputports_table, verbose)
     if portid == -1:
         print(f"MIDI port {midi_input_portname} not found. Program stopped.")
@@ -750,6 +815,11 @@ def main():
     if verbose:
         print(f"MIDI port selected: {portid}")
         
+    # set just before the port is opened: the MIDI input thread started by rtmidi inherits the priority,
+    # the setlist loading and the VLC init keep a normal priority
+    if args.realtime:
+        set_realtime_priority(verbose)
+
     # open the MIDI Input Port
     try:
         selected_midi_input_port = midi_input_ports.open_port(portid)
@@ -762,99 +832,207 @@ def main():
     
     PLAYPAUSE_MODE_PLAYONLY = 0   # distinct command for pause
     PLAYPAUSE_MODE_TOGGLE = 1     # case of play/pause button in LivePrompter
-    cmd_playpause_mode = PLAYPAUSE_MODE_TOGGLE
     
     PLAYPAUSE_STATUS_PAUSE = 0
     PLAYPAUSE_STATUS_PLAY = 1
-    cmd_playpause_status = PLAYPAUSE_STATUS_PAUSE
+
+    # play / pause state, shared by the MIDI handlers below
+    # default_media_timer: pending stop of the default media, if it is being played
+    playback_state = {'mode': PLAYPAUSE_MODE_TOGGLE, 'status': PLAYPAUSE_STATUS_PAUSE, 'default_media_timer': None}
     
+    # =============================================================================
+    # Verbose output on the MIDI path, bound once: does nothing (and formats nothing) when verbose is off
+    # =============================================================================
+    def log_nothing(*args):
+        pass
+
+    def log_midi_message(msg, now=datetime.now):
+        timestamp = now().time().isoformat(timespec='milliseconds')  # e.g. 14:52:03.123
+        print(f"[{timestamp}] MIDI Input: {decode_midi_message(msg)}")
+
+    if verbose:
+        from midi_debug import decode_midi_message
+
+    log = print if verbose else log_nothing
+    log_midi = log_midi_message if verbose else log_nothing
+
+    # =============================================================================
+    # MIDI command handlers
+    # =============================================================================
+    # The VLC calls run in a single worker thread, in the order of the MIDI commands:
+    # a slow stop() (decoder teardown) never blocks the dispatch of the next MIDI messages
+    # (the worker is started after the real-time switch: it goes back to the normal priority, and so do
+    # the libvlc input, decoder and output threads that it starts when a media is played)
+    player_commands = ThreadPoolExecutor(max_workers=1, initializer=set_normal_priority if args.realtime else None)
+    submit_player_command = player_commands.submit
+
+    def report_player_error(future):
+        # the VLC calls run in the worker: their errors are reported here, not in the dispatch loop
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Error: VLC command failed: {future.exception()}")
+
+    def run_player_command(command, *args):
+        submit_player_command(command, *args).add_done_callback(report_player_error)
+
+    # player methods and lookups bound once: the handlers use them without an attribute lookup per MIDI event
+    player_play = partial(run_player_command, player_main.play)
+    player_pause = partial(run_player_command, player_main.pause)
+    player_stop = partial(run_player_command, player_main.stop)
+    player_set_media = partial(run_player_command, player_main.set_media)
+    get_cached_media = media_cache.get
+    get_media_desc = setlist_by_index.get
+
+    def cancel_default_media_stop():
+        # a pending stop of the default media must not stop what the musician asked for meanwhile
+        timer = playback_state['default_media_timer']
+        if timer is not None:
+            timer.cancel()
+            playback_state['default_media_timer'] = None
+
+    def stop_default_media(timer):
+        # Run by the main thread, when the timer has posted its end: ignored if the stop was cancelled
+        # meanwhile (a MIDI command may have been queued before the timer posted its end)
+        if playback_state['default_media_timer'] is timer:
+            playback_state['default_media_timer'] = None
+            player_stop()
+            playback_state['status'] = PLAYPAUSE_STATUS_PAUSE
+
+    def post_default_media_stop(timer):
+        # Run by the timer thread: the stop itself is done by the main thread, in the order of the MIDI commands
+        midi_queue.put((None, partial(stop_default_media, timer)))
+
+    def handle_program_change(msg):
+        # Program Change = change media to be played
+        cancel_default_media_stop()
+
+        # by default, the player is not started, waiting for an explicit PLAY commmand
+        player_stop()
+        playback_state['status'] = PLAYPAUSE_STATUS_PAUSE
+
+        playlist_index = msg[1]
+
+        # the setlist indexes may have gaps: an index is valid if the setlist has an entry for it
+        media_desc = get_media_desc(playlist_index)
+        if media_desc is not None:
+            log("media_desc =", media_desc)
+            media_main = get_cached_media(playlist_index)
+            if media_main is not None:
+                log("Info: loading", media_desc.path)
+                player_set_media(media_main)
+            else:
+                if default_media is not None:
+                    player_set_media(default_media)
+                    player_play()
+                    # stopped later by a timer thread, so that the MIDI thread is not blocked meanwhile
+                    timer = threading.Timer(DEFAULT_MEDIA_PLAY_TIME, post_default_media_stop)
+                    timer.args = (timer,)
+                    timer.daemon = True
+                    timer.start()
+                    playback_state['default_media_timer'] = timer
+
+        else:
+            print(f"Error: received index {playlist_index} out of range vs the specified set list. Playing nothing.")
+
+    def transport_playpause():
+        # Play, or play/pause buttton - handle a toggle to be synchronized with LivePromper
+        cancel_default_media_stop()
+        if playback_state['mode'] == PLAYPAUSE_MODE_TOGGLE and playback_state['status'] == PLAYPAUSE_STATUS_PLAY:
+            player_pause()
+            playback_state['status'] = PLAYPAUSE_STATUS_PAUSE
+        else:
+            player_play()
+            playback_state['status'] = PLAYPAUSE_STATUS_PLAY
+
+    def transport_pause():
+        # Pause button (does not exist in LivePrompter)
+        cancel_default_media_stop()
+        player_pause()
+        playback_state['status'] = PLAYPAUSE_STATUS_PAUSE
+
+    def transport_stop():
+        # Reset button stop and be ready to play again from the beginning
+        cancel_default_media_stop()
+        player_stop()
+        playback_state['status'] = PLAYPAUSE_STATUS_PAUSE
+
+    def transport_up():
+        # Button UP in LivePrompter
+        log("Received transport command UP - Ignored.")
+
+    def transport_down():
+        # Button DOWN in LivePrompter
+        log("Received transport command DOWN - Ignored.")
+
+    def transport_ignore():
+        pass
+
+    # Control Change number -> transport handler
+    transport_handlers = {
+        2: transport_playpause,
+        3: transport_pause,
+        9: transport_stop,
+        4: transport_up,
+        5: transport_down,
+    }
+
+    get_transport_handler = transport_handlers.get
+
+    def handle_control_change(msg):
+        # Control Change = Play / Pause / Stop
+        get_transport_handler(msg[1], transport_ignore)()
+
+    # status byte -> handler, for the commands accepted on the selected MIDI channel (1 to 16)
+    # messages of the other channels are not found in the dict, and dropped with a single lookup
+    channel_bits = midi_channel - 1
+    status_handlers = {
+        0xC0 | channel_bits: handle_program_change,
+        0xB0 | channel_bits: handle_control_change,
+    }
+    get_status_handler = status_handlers.get
+
+    # =============================================================================
+    # Handle the MIDI messages: called by the main thread for each message received
+    # =============================================================================
+    def dispatch_midi_message(msg):
+        log_midi(msg)
+
+        handler = get_status_handler(msg[0])
+        if handler:
+            handler(msg)
+        #else:
+            #print(f"Ignoring MIDI command {msg} - waiting on channel {midi_channel}")
+
+    # The rtmidi thread only queues the messages, and the main thread blocks until one arrives:
+    # no polling, and a slow VLC call never delays the reception of the next messages
+    # Internal events (e.g. the end of the default media) are queued as (None, function to run)
+    midi_queue = queue.Queue()
+
+    def on_midi_message(event, data):
+        midi_queue.put(event)
+
+    # SysEx, MIDI clock and Active Sensing are never used: drop them before they reach Python
+    selected_midi_input_port.ignore_types(sysex=True, timing=True, active_sense=True)
+    selected_midi_input_port.set_callback(on_midi_message)
+
+    get_midi_event = midi_queue.get
+    queue_empty = queue.Empty
     try:
         while True:
-            while selected_midi_input_port.is_port_open():
-                inmsg = selected_midi_input_port.get_message()
-                if inmsg:
-                    (msg, dt) = inmsg
-                    command = msg[0] & 0xF0
-                    channel = (msg[0] & 0x0F) + 1
-
-                    if verbose:
-                        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]  # e.g. 14:52:03.123
-                        #print(f"[{timestamp}] MIDI Input: {decode_midi_message(msg)}")
-                        #print(f"Received MIDI message {msg} - Command {hex(command)} on channel {channel}")
-                        
-                    if channel == midi_channel:
-                        
-                        if command == 0xC0:   # Program Change = change media to be played
-                            player_main.stop()
-                            cmd_playpause_status = PLAYPAUSE_STATUS_PAUSE
-
-                            playlist_index = msg[1]
-                            
-                            if playlist_index >= 0 and playlist_index < len(resolved_setlist):
-                                media_desc = get_mediadesc_by_index(resolved_setlist, playlist_index)
-                                print(f"media_desc = {media_desc}")
-                                if media_desc and check_file_exists(media_desc[1]):
-                                    if verbose:
-                                        print(f"Info: loading {media_desc[1]}")
-                                    media_main = vlc_instance_main.media_new(media_desc[1])
-                                    player_main.set_media(media_main)
-                                else:
-                                    if check_file_exists(defaultMediaFile):
-                                        media_main = vlc_instance_main.media_new(defaultMediaFile)
-                                        player_main.set_media(media_main)   
-                                        player_main.play()
-                                        time.sleep(5)
-                                        player_main.stop()
-                                        cmd_playpause_status = PLAYPAUSE_STATUS_PAUSE
-                                        
-                                
-                            else:
-                                print(f"Error: received index {playlist_index} out of range vs the specified set list. Playing nothing.")
-                                
-                            
-                            # by default, the player is not started, waiting for an explicit PLAY commmand
-                            player_main.stop()
-                            cmd_playpause_status = PLAYPAUSE_STATUS_PAUSE
-                            
-                        elif command == 0xB0: # Control Change = Play / Pause / Stop
-                            transport_cmd = msg[1]
-                            # Play, or play/pause buttton - handle a toggle to be synchronized with LivePromper
-                            if transport_cmd == 2:
-                                if cmd_playpause_mode == PLAYPAUSE_MODE_TOGGLE:
-                                    if cmd_playpause_status == PLAYPAUSE_STATUS_PAUSE:
-                                        player_main.play()
-                                        cmd_playpause_status = PLAYPAUSE_STATUS_PLAY
-                                    else:
-                                        player_main.pause()
-                                        cmd_playpause_status = PLAYPAUSE_STATUS_PAUSE
-                                else:
-                                    player_main.play()
-                                    cmd_playpause_status = PLAYPAUSE_STATUS_PLAY
-                                    
-                            # Pause button (does not exist in LivePrompter)
-                            elif transport_cmd == 3: 
-                                player_main.pause()
-                                cmd_playpause_status = PLAYPAUSE_STATUS_PAUSE
-                                
-                            # Reset button stop and be ready to play again from the beginning
-                            elif transport_cmd == 9:
-                                player_main.stop()
-                                cmd_playpause_status = PLAYPAUSE_STATUS_PAUSE
-
-                            # Button UP in LivePrompter
-                            elif  transport_cmd == 4:
-                                print(f"Received transport command UP - Ignored.")
-                        
-                            # Button DOWN in LivePrompter
-                            elif  transport_cmd == 5:
-                                print(f"Received transport command DOWN - Ignored.")
-                                
-                    #else:
-                        #print(f"Ignoring MIDI command received on channel {channel} - waiting on channel {midi_channel}")
-            time.sleep(0.010)
+            try:
+                (msg, dt) = get_midi_event(timeout=1.0)
+            except queue_empty:
+                continue    # the timeout only lets KeyboardInterrupt be delivered on Windows
+            if msg is None:
+                dt()        # internal event
+                continue
+            dispatch_midi_message(msg)
             
     except KeyboardInterrupt:
+        selected_midi_input_port.cancel_callback()
+        cancel_default_media_stop()
+        player_commands.shutdown(wait=True)     # let the pending VLC calls end before the final stop
         player_main.stop()
+        selected_midi_input_port.close_port()
         
 
 